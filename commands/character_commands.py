@@ -0,0 +1,217 @@
+# commands/character_commands.py
+import asyncio
+from discord.ext import commands
+import discord
+from discord import app_commands
+from utils.character_sheet import ABILITIES, SKILLS, ROLL_MODES, Attack, ability_index, parse_mask, signed, skill_index
+from utils.data_manager import *
+from utils.roll_history import record_roll
+
+# Discord allows 25 embed fields; keep room for the DC summary.
+GROUP_CHECK_FIELDS = 20
+FIELD_VALUE_LIMIT = 1024
+
+def capped_lines(lines, limit=FIELD_VALUE_LIMIT):
+    """Join lines for an embed field, replacing the ones that don't fit with a count."""
+    text = "\n".join(lines)
+    if len(text) <= limit:
+        return text
+    kept = []
+    for i, line in enumerate(lines):
+        more = f"...and {len(lines) - i} more"
+        if len("\n".join(kept + [line, more])) > limit:
+            return "\n".join(kept + [more])
+        kept.append(line)
+
+def roll_embed(title, total, details, color):
+    embed = discord.Embed(title=title, color=color)
+    embed.add_field(name="Total", value=total, inline=False)
+    for det in details:
+        rolls_str = f"Rolls: {det['rolls']}"
+        if det['kept'] != det['rolls']:
+            rolls_str += f"\nKept: {det['kept']}"
+        if det['sides'] == 20 and det['kept'] in ([20], [1]):
+            rolls_str += f"\nNatural {det['kept'][0]}!"
+        embed.add_field(name=det['expression'], value=rolls_str, inline=True)
+    return embed
+
+def sheet_embed(name, char, sheet):
+    derived = sheet.derived()
+    embed = discord.Embed(title=f"Character Sheet: {name}", color=discord.Color.purple())
+    embed.add_field(name="HP", value=f"{char['hp']}/{char['max_hp']}")
+    embed.add_field(name="AC", value=sheet.ac)
+    embed.add_field(name="Proficiency", value=signed(sheet.proficiency))
+    embed.add_field(name="Abilities", value="\n".join(
+        f"{ability.upper()} {score} ({signed(mod)}), save {signed(save)}"
+        for ability, score, mod, save in zip(ABILITIES, sheet.scores, derived.mods, derived.saves)
+    ), inline=False)
+    trained = [
+        f"{skill.replace('_', ' ').title()} {signed(bonus)}"
+        for i, ((skill, _), bonus) in enumerate(zip(SKILLS, derived.skills))
+        if (sheet.skill_profs | sheet.expertise) >> i & 1
+    ]
+    if trained:
+        embed.add_field(name="Proficient Skills", value="\n".join(trained), inline=False)
+    if derived.attacks:
+        embed.add_field(name="Attacks", value=capped_lines([
+            f"{sheet.attacks[key].name}: {signed(to_hit)} to hit, {damage}"
+            for key, (to_hit, damage) in derived.attacks.items()
+        ]), inline=False)
+    return embed
+
+class CharacterCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="sheet", description="Set or view a character sheet")
+    @app_commands.describe(
+        character="Character name (add with /addchar first)",
+        skills="Proficient skills, comma separated", expertise="Expertise skills, comma separated",
+        saves="Proficient saving throws, comma separated (e.g. dex,wis)",
+    )
+    async def sheet(self, interaction: discord.Interaction, character: str,
+                    strength: int = None, dexterity: int = None, constitution: int = None,
+                    intelligence: int = None, wisdom: int = None, charisma: int = None,
+                    proficiency: int = None, ac: int = None,
+                    skills: str = None, expertise: str = None, saves: str = None):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        scores = {
+            'str': strength, 'dex': dexterity, 'con': constitution,
+            'int': intelligence, 'wis': wisdom, 'cha': charisma,
+        }
+        try:
+            changes = {
+                'scores': {k: v for k, v in scores.items() if v is not None} or None,
+                'proficiency': proficiency, 'ac': ac,
+                'skill_profs': parse_mask(skills, skill_index) if skills is not None else None,
+                'expertise': parse_mask(expertise, skill_index) if expertise is not None else None,
+                'save_profs': parse_mask(saves, ability_index) if saves is not None else None,
+            }
+            changes = {k: v for k, v in changes.items() if v is not None}
+            # With no stats given this only shows the sheet, so it must not create one.
+            if changes:
+                await asyncio.to_thread(update_sheet, interaction.guild_id, character, **changes)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        char = await asyncio.to_thread(get_character, interaction.guild_id, character)
+        sheet = await asyncio.to_thread(get_sheet, interaction.guild_id, character)
+        if char is None or sheet is None:
+            await interaction.response.send_message(f"No character sheet for {character}. Set a stat to create one.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=sheet_embed(character, char, sheet))
+
+    @app_commands.command(name="addattack", description="Add an attack to a character sheet")
+    @app_commands.describe(character="Character name", name="Attack name", ability="Ability used (str/dex/...)",
+                           damage="Damage dice before ability modifier, e.g. 1d8", proficient="Proficient with this attack",
+                           bonus="Extra to-hit bonus, e.g. magic weapon")
+    async def addattack(self, interaction: discord.Interaction, character: str, name: str, ability: str, damage: str,
+                        proficient: bool = True, bonus: int = 0):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        try:
+            sheet = await asyncio.to_thread(add_sheet_attack, interaction.guild_id, character, Attack(name, ability, damage, proficient, bonus))
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        to_hit, dmg = sheet.derived().attacks[name.lower()]
+        await interaction.response.send_message(f"Added {name} to {character}: {signed(to_hit)} to hit, {dmg} damage.")
+
+    async def resolve_single(self, interaction, character, title, resolve):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        try:
+            results = await asyncio.to_thread(resolve_rolls, interaction.guild_id, [character], resolve)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        _, notation, total, details = results[0]
+        await interaction.response.send_message(embed=roll_embed(f"{character}: {title} ({notation})", total, details, discord.Color.blue()))
+        record_roll(interaction.guild_id, interaction.user.id, notation, total, details)
+
+    @app_commands.command(name="check", description="Roll a skill check from a character sheet")
+    @app_commands.describe(skill="Skill, e.g. perception", character="Character name", mode="normal/advantage/disadvantage")
+    async def check(self, interaction: discord.Interaction, skill: str, character: str, mode: str = "normal"):
+        if mode not in ROLL_MODES:
+            await interaction.response.send_message("Invalid mode: use normal, advantage, or disadvantage.", ephemeral=True)
+            return
+        title = f"{skill.replace('_', ' ').title()} Check"
+        await self.resolve_single(interaction, character, title, lambda sheet: sheet.check_roll(skill, mode))
+
+    @app_commands.command(name="save", description="Roll a saving throw from a character sheet")
+    @app_commands.describe(ability="Ability, e.g. dex or wisdom", character="Character name", mode="normal/advantage/disadvantage")
+    async def save(self, interaction: discord.Interaction, ability: str, character: str, mode: str = "normal"):
+        if mode not in ROLL_MODES:
+            await interaction.response.send_message("Invalid mode: use normal, advantage, or disadvantage.", ephemeral=True)
+            return
+        title = f"{ability.upper()[:3]} Save"
+        await self.resolve_single(interaction, character, title, lambda sheet: sheet.save_roll(ability, mode))
+
+    @app_commands.command(name="groupcheck", description="Roll the same skill check for every character with a sheet")
+    @app_commands.describe(skill="Skill, e.g. stealth", dc="Difficulty class (optional)", mode="normal/advantage/disadvantage")
+    async def groupcheck(self, interaction: discord.Interaction, skill: str, dc: int = None, mode: str = "normal"):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        if mode not in ROLL_MODES:
+            await interaction.response.send_message("Invalid mode: use normal, advantage, or disadvantage.", ephemeral=True)
+            return
+        try:
+            results = await asyncio.to_thread(resolve_rolls, interaction.guild_id, None, lambda sheet: sheet.check_roll(skill, mode))
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        if not results:
+            await interaction.response.send_message("No character sheets set up.")
+            return
+        embed = discord.Embed(title=f"Group {skill.replace('_', ' ').title()} Check", color=discord.Color.green())
+        passed = 0
+        for i, (name, notation, total, details) in enumerate(results):
+            value = f"{total} ({notation}: {details[0]['kept']})"
+            if dc is not None:
+                passed += total >= dc
+                value += " ✅" if total >= dc else " ❌"
+            if i < GROUP_CHECK_FIELDS:
+                embed.add_field(name=name, value=value, inline=True)
+        if len(results) > GROUP_CHECK_FIELDS:
+            embed.set_footer(text=f"Showing {GROUP_CHECK_FIELDS} of {len(results)} characters.")
+        if dc is not None:
+            outcome = "succeeds" if passed * 2 >= len(results) else "fails"
+            embed.add_field(name=f"DC {dc}", value=f"{passed}/{len(results)} passed, the group {outcome}.", inline=False)
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="attack-as", description="Attack using a character sheet's attack")
+    @app_commands.describe(character="Character name", attack="Attack name (defaults to the first)", mode="normal/advantage/disadvantage")
+    async def attack_as(self, interaction: discord.Interaction, character: str, attack: str = None, mode: str = "normal"):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        if mode not in ROLL_MODES:
+            await interaction.response.send_message("Invalid mode: use normal, advantage, or disadvantage.", ephemeral=True)
+            return
+        sheet = await asyncio.to_thread(get_sheet, interaction.guild_id, character)
+        if sheet is None:
+            await interaction.response.send_message(f"No character sheet for {character}", ephemeral=True)
+            return
+        try:
+            name, to_hit_roll, damage_roll = sheet.attack_rolls(attack, mode)
+            to_hit, hit_details = to_hit_roll.roll()
+            dmg, dmg_details = damage_roll.roll()
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        embed = roll_embed(f"{character}: {name}", to_hit, hit_details, discord.Color.red())
+        embed.set_field_at(0, name=f"To Hit ({to_hit_roll.notation})", value=to_hit, inline=False)
+        embed.add_field(name=f"Damage ({damage_roll.notation})", value=dmg, inline=False)
+        for det in dmg_details:
+            embed.add_field(name=det['expression'], value=f"Rolls: {det['rolls']}", inline=True)
+        await interaction.response.send_message(embed=embed)
+        record_roll(interaction.guild_id, interaction.user.id, to_hit_roll.notation, to_hit, hit_details)
+        record_roll(interaction.guild_id, interaction.user.id, damage_roll.notation, dmg, dmg_details)
+
+async def setup(bot):
+    await bot.add_cog(CharacterCog(bot))
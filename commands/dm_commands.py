@@ -1,4 +1,5 @@
 # commands/dm_commands.py
+import asyncio
 from discord.ext import commands
 import discord
 from discord import app_commands
@@ -16,7 +17,7 @@ class DMCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        update_hp(interaction.guild_id, name, hp)
+        await asyncio.to_thread(update_hp, interaction.guild_id, name, hp)
         await interaction.response.send_message(f"Set {name}'s HP to {hp}.")
 
     @app_commands.command(name="damage", description="Deal damage to a character")
@@ -26,8 +27,8 @@ class DMCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        damage_character(interaction.guild_id, name, amount)
-        char = get_character(interaction.guild_id, name)
+        await asyncio.to_thread(damage_character, interaction.guild_id, name, amount)
+        char = await asyncio.to_thread(get_character, interaction.guild_id, name)
         await interaction.response.send_message(f"Dealt {amount} damage to {name}. Current HP: {char['hp']}/{char['max_hp']}.")
 
     @app_commands.command(name="heal", description="Heal a character")
@@ -37,8 +38,8 @@ class DMCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        heal_character(interaction.guild_id, name, amount)
-        char = get_character(interaction.guild_id, name)
+        await asyncio.to_thread(heal_character, interaction.guild_id, name, amount)
+        char = await asyncio.to_thread(get_character, interaction.guild_id, name)
         await interaction.response.send_message(f"Healed {name} by {amount}. Current HP: {char['hp']}/{char['max_hp']}.")
 
     @app_commands.command(name="attack", description="NPC attack with damage calculations")
@@ -69,7 +70,7 @@ class DMCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        chars = get_all_characters(interaction.guild_id)
+        chars = await asyncio.to_thread(get_all_characters, interaction.guild_id)
         if not chars:
             await interaction.response.send_message("No characters added.")
             return
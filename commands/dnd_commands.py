@@ -1,9 +1,21 @@
 # commands/dnd_commands.py
+import asyncio
 from discord.ext import commands
 import discord
 from discord import app_commands
 from utils.dice_parser import parse_and_roll
 from utils.data_manager import *
+from utils.roll_history import MAX_SIDES, face_counts, record_roll, summarize, user_face_counts
+
+def fairness_verdict(stats):
+    detail = f"χ² = {stats['chi2']:.1f}, p = {stats['p_value']:.3f}"
+    if not stats['conclusive']:
+        return f"Not enough rolls for a verdict yet; need {5 * stats['sides']} dice ({detail})."
+    if stats['p_value'] < 0.01:
+        return f"These dice look cursed ({detail})."
+    if stats['p_value'] < 0.05:
+        return f"Slightly suspicious ({detail})."
+    return f"Looks fair ({detail})."
 
 class DNDCog(commands.Cog):
     def __init__(self, bot):
@@ -27,6 +39,62 @@ class DNDCog(commands.Cog):
             await interaction.response.send_message(embed=embed)
         except ValueError as e:
             await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        # Only rolls the player actually saw count towards their stats.
+        record_roll(interaction.guild_id, interaction.user.id, notation, total, details)
+
+    @app_commands.command(name="rollstats", description="Dice distribution and fairness check for a player")
+    @app_commands.describe(member="Player (defaults to you)", sides="Die size, e.g. 20", scope="all/session")
+    async def rollstats(self, interaction: discord.Interaction, member: discord.Member = None, sides: int = 20, scope: str = "all"):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        if scope not in ['all', 'session']:
+            await interaction.response.send_message("Invalid scope: use all or session.", ephemeral=True)
+            return
+        if not 2 <= sides <= MAX_SIDES:
+            await interaction.response.send_message(f"Die size must be between 2 and {MAX_SIDES}.", ephemeral=True)
+            return
+        member = member or interaction.user
+        counts = await asyncio.to_thread(face_counts, interaction.guild_id, sides, member.id, session_only=scope == "session")
+        stats = summarize(counts)
+        if not stats['dice']:
+            await interaction.response.send_message(f"No d{sides} rolls recorded for {member.display_name}.")
+            return
+        embed = discord.Embed(title=f"d{sides} Stats: {member.display_name}", color=discord.Color.blue())
+        embed.add_field(name="Dice Rolled", value=stats['dice'])
+        embed.add_field(name="Average", value=f"{stats['mean']:.2f} (expected {stats['expected_mean']:.1f})")
+        embed.add_field(name=f"Nat {sides} / Nat 1", value=f"{stats['max_rate']:.1%} / {stats['min_rate']:.1%} (expected {1 / sides:.1%})")
+        if sides <= 20:
+            peak = max(counts)
+            bars = "\n".join(f"{face:>2} {'█' * round(15 * c / peak)} {c}" for face, c in enumerate(counts, 1))
+            embed.add_field(name="Distribution", value=f"```\n{bars}\n```", inline=False)
+        embed.add_field(name="Fairness", value=fairness_verdict(stats), inline=False)
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="rollstats-party", description="Compare dice luck across the party")
+    @app_commands.describe(sides="Die size, e.g. 20", scope="all/session")
+    async def rollstats_party(self, interaction: discord.Interaction, sides: int = 20, scope: str = "all"):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        if scope not in ['all', 'session']:
+            await interaction.response.send_message("Invalid scope: use all or session.", ephemeral=True)
+            return
+        if not 2 <= sides <= MAX_SIDES:
+            await interaction.response.send_message(f"Die size must be between 2 and {MAX_SIDES}.", ephemeral=True)
+            return
+        per_user = await asyncio.to_thread(user_face_counts, interaction.guild_id, sides, session_only=scope == "session")
+        if not per_user:
+            await interaction.response.send_message(f"No d{sides} rolls recorded.")
+            return
+        embed = discord.Embed(title=f"Party d{sides} Stats", color=discord.Color.blue())
+        ranked = sorted(((user_id, summarize(counts)) for user_id, counts in per_user.items()), key=lambda x: x[1]['mean'], reverse=True)
+        for i, (user_id, stats) in enumerate(ranked[:20], 1):
+            value = (f"<@{user_id}>: {stats['dice']} dice, nat {sides} {stats['max_rate']:.1%}, "
+                     f"nat 1 {stats['min_rate']:.1%}\n{fairness_verdict(stats)}")
+            embed.add_field(name=f"{i}. Average {stats['mean']:.2f}", value=value, inline=False)
+        await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="initiative", description="Initiative tracking: add, view, clear")
     @app_commands.describe(action="add/view/clear", name="Character name (for add)", roll="Roll notation (for add)")
@@ -41,12 +109,12 @@ class DNDCog(commands.Cog):
                 return
             try:
                 iroll, _ = parse_and_roll(roll)
-                add_initiative(guild_id, name, iroll)
+                await asyncio.to_thread(add_initiative, guild_id, name, iroll)
                 await interaction.response.send_message(f"Added {name} with initiative {iroll}.")
             except ValueError as e:
                 await interaction.response.send_message(str(e), ephemeral=True)
         elif action.lower() == "view":
-            init = get_initiative(guild_id)
+            init = await asyncio.to_thread(get_initiative, guild_id)
             if not init:
                 await interaction.response.send_message("No initiative order set.")
                 return
@@ -55,7 +123,7 @@ class DNDCog(commands.Cog):
                 embed.add_field(name=f"{i}. {entry['name']}", value=entry['roll'], inline=False)
             await interaction.response.send_message(embed=embed)
         elif action.lower() == "clear":
-            clear_initiative(guild_id)
+            await asyncio.to_thread(clear_initiative, guild_id)
             await interaction.response.send_message("Initiative order cleared.")
         else:
             await interaction.response.send_message("Invalid action: use add, view, or clear.", ephemeral=True)
@@ -67,7 +135,7 @@ class DNDCog(commands.Cog):
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
         try:
-            add_character(interaction.guild_id, name, max_hp)
+            await asyncio.to_thread(add_character, interaction.guild_id, name, max_hp)
             await interaction.response.send_message(f"Added character {name} with {max_hp} HP.")
         except ValueError as e:
             await interaction.response.send_message(str(e), ephemeral=True)
@@ -78,7 +146,7 @@ class DNDCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        char = get_character(interaction.guild_id, name)
+        char = await asyncio.to_thread(get_character, interaction.guild_id, name)
         if not char:
             await interaction.response.send_message("Character not found.", ephemeral=True)
             return
@@ -89,10 +157,11 @@ class DNDCog(commands.Cog):
     @app_commands.command(name="help", description="Show bot help with feature categories")
     async def help(self, interaction: discord.Interaction):
         embed = discord.Embed(title="D&D Bot Help", description="Commands organized by category", color=discord.Color.green())
-        embed.add_field(name="D&D Commands", value="/roll\n/initiative\n/addchar\n/checkchar", inline=False)
+        embed.add_field(name="D&D Commands", value="/roll\n/rollstats\n/rollstats-party\n/initiative\n/addchar\n/checkchar", inline=False)
+        embed.add_field(name="Character Sheets", value="/sheet\n/addattack\n/check\n/save\n/groupcheck\n/attack-as", inline=False)
         embed.add_field(name="DM Commands (Require Manage Server)", value="/dmhp\n/damage\n/heal\n/attack\n/status", inline=False)
         embed.add_field(name="Campaign Management", value="/note\n/notes\n/quest\n/quests\n/location\n/session\n/leave\n/inventory\n/bag", inline=False)
-        embed.add_field(name="Music Commands", value="/play\n/stop", inline=False)
+        embed.add_field(name="Music Commands", value="/play\n/ambience\n/ambiences\n/stop", inline=False)
         embed.add_field(name="Moderation Commands", value="/ban\n/mute\n/unmute", inline=False)
         await interaction.response.send_message(embed=embed)
 
@@ -1,13 +1,16 @@
 # commands/music_commands.py
+import asyncio
 import logging
 from discord.ext import commands
 import discord
 from discord import app_commands
 import youtube_dl
+from utils.soundboard import OpusCache, LoopingOpusSource, cached_packets, list_scenes
 
 class MusicCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.cache = OpusCache()
 
     @app_commands.command(name="play", description="Play audio from YouTube in voice channel")
     @app_commands.describe(url="YouTube URL or search term")
@@ -41,6 +44,50 @@ class MusicCog(commands.Cog):
             logging.error(e)
             await interaction.followup.send("Failed to play audio.", ephemeral=True)
 
+    @app_commands.command(name="ambience", description="Loop an ambience scene, crossfading from the current one")
+    @app_commands.describe(scene="Scene name (see /ambiences)")
+    async def ambience(self, interaction: discord.Interaction, scene: str):
+        if interaction.guild is None:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        path = list_scenes().get(scene.lower())
+        if not path:
+            await interaction.response.send_message("Unknown scene. Use /ambiences to list them.", ephemeral=True)
+            return
+        user = interaction.user
+        if not user.voice or not user.voice.channel:
+            await interaction.response.send_message("You must be in a voice channel.", ephemeral=True)
+            return
+        channel = user.voice.channel
+        voice_client = interaction.guild.voice_client
+        if not voice_client:
+            voice_client = await channel.connect()
+        await interaction.response.defer()
+        try:
+            opus_path = await asyncio.to_thread(self.cache.get, path)
+            packets = await asyncio.to_thread(cached_packets, opus_path)
+            source = voice_client.source
+            if voice_client.is_playing() and isinstance(source, LoopingOpusSource):
+                source.crossfade_to(packets, scene.lower())
+                await interaction.followup.send(f"Crossfading to {scene}.")
+            else:
+                if voice_client.is_playing():
+                    voice_client.stop()
+                voice_client.play(LoopingOpusSource(packets, scene.lower()))
+                await interaction.followup.send(f"Playing ambience: {scene}")
+        except Exception as e:
+            logging.error(e)
+            await interaction.followup.send("Failed to play ambience.", ephemeral=True)
+
+    @app_commands.command(name="ambiences", description="List available ambience scenes")
+    async def ambiences(self, interaction: discord.Interaction):
+        scenes = list_scenes()
+        if not scenes:
+            await interaction.response.send_message("No ambience scenes available.")
+            return
+        embed = discord.Embed(title="Ambience Scenes", description="\n".join(scenes), color=discord.Color.dark_purple())
+        await interaction.response.send_message(embed=embed)
+
     @app_commands.command(name="stop", description="Stop music and disconnect from voice")
     async def stop(self, interaction: discord.Interaction):
         if interaction.guild is None:
@@ -1,9 +1,11 @@
 # commands/notes_commands.py
+import asyncio
 import logging
 from discord.ext import commands
 import discord
 from discord import app_commands
 from utils.data_manager import *
+from utils.roll_history import start_session
 
 class CampaignCog(commands.Cog):
     def __init__(self, bot):
@@ -15,7 +17,7 @@ class CampaignCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        add_note(interaction.guild_id, text)
+        await asyncio.to_thread(add_note, interaction.guild_id, text)
         await interaction.response.send_message("Note added.")
 
     @app_commands.command(name="notes", description="View all campaign notes (paginated)")
@@ -23,7 +25,7 @@ class CampaignCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        notes = get_notes(interaction.guild_id)
+        notes = await asyncio.to_thread(get_notes, interaction.guild_id)
         if not notes:
             await interaction.response.send_message("No notes.")
             return
@@ -41,7 +43,7 @@ class CampaignCog(commands.Cog):
         if status not in ['active', 'completed', 'failed', 'on_hold']:
             await interaction.response.send_message("Invalid status.", ephemeral=True)
             return
-        add_or_update_quest(interaction.guild_id, name, desc, status)
+        await asyncio.to_thread(add_or_update_quest, interaction.guild_id, name, desc, status)
         await interaction.response.send_message(f"Quest {name} set to {status}.")
 
     @app_commands.command(name="quests", description="View all quests grouped by status")
@@ -49,7 +51,7 @@ class CampaignCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        quests = get_quests(interaction.guild_id)
+        quests = await asyncio.to_thread(get_quests, interaction.guild_id)
         embed = discord.Embed(title="Quests", color=discord.Color.gold())
         for st, qlist in quests.items():
             if qlist:
@@ -64,10 +66,10 @@ class CampaignCog(commands.Cog):
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
         if loc:
-            set_location(interaction.guild_id, loc)
+            await asyncio.to_thread(set_location, interaction.guild_id, loc)
             await interaction.response.send_message(f"Location set to {loc}.")
         else:
-            current = get_location(interaction.guild_id)
+            current = await asyncio.to_thread(get_location, interaction.guild_id)
             await interaction.response.send_message(f"Current location: {current or 'Unknown'}.")
 
     @app_commands.command(name="session", description="Start new session and join voice channel")
@@ -86,7 +88,8 @@ class CampaignCog(commands.Cog):
             return
         try:
             await channel.connect()
-            set_session_voice(interaction.guild_id, channel.id)
+            await asyncio.to_thread(set_session_voice, interaction.guild_id, channel.id)
+            start_session(interaction.guild_id)
             await interaction.response.send_message(f"Session started. Joined {channel.name}.")
         except Exception as e:
             logging.error(e)
@@ -99,7 +102,7 @@ class CampaignCog(commands.Cog):
             return
         if interaction.guild.voice_client:
             await interaction.guild.voice_client.disconnect()
-            set_session_voice(interaction.guild_id, None)
+            await asyncio.to_thread(set_session_voice, interaction.guild_id, None)
             await interaction.response.send_message("Session ended. Left voice channel.")
         else:
             await interaction.response.send_message("Not currently in a voice channel.", ephemeral=True)
@@ -110,7 +113,7 @@ class CampaignCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        add_inventory(interaction.guild_id, item, qty, desc)
+        await asyncio.to_thread(add_inventory, interaction.guild_id, item, qty, desc)
         await interaction.response.send_message(f"Added {qty} x {item} to inventory.")
 
     @app_commands.command(name="bag", description="View party inventory with descriptions")
@@ -118,7 +121,7 @@ class CampaignCog(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
             return
-        inv = get_inventory(interaction.guild_id)
+        inv = await asyncio.to_thread(get_inventory, interaction.guild_id)
         if not inv:
             await interaction.response.send_message("Inventory is empty.")
             return
@@ -0,0 +1,125 @@
+# interaction_client.py (local test client for interactions.py)
+# python interaction_client.py keygen
+# DISCORD_PUBLIC_KEY=<public> DISCORD_API_BASE=http://127.0.0.1:8090 gunicorn ... interactions:app
+# python interaction_client.py bench --seed <seed> --sink-port 8090 --command roll notation=2d6+3
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+import aiohttp
+from aiohttp import web
+from nacl.signing import SigningKey
+
+def parse_option(text):
+    name, _, value = text.partition('=')
+    if value.lstrip('-').isdigit():
+        value = int(value)
+    return {'name': name, 'value': value}
+
+def build_payload(i, args):
+    return {
+        'type': 2,
+        'id': str(1000000 + i),
+        'application_id': '1',
+        'token': f'bench-{i}',
+        'guild_id': str(args.guild_id),
+        'channel_id': '1',
+        'member': {
+            'user': {'id': str(args.user_id), 'username': 'bench'},
+            'permissions': str(args.permissions),
+        },
+        'data': {'name': args.command, 'type': 1, 'options': [parse_option(o) for o in args.options]},
+    }
+
+def sign(signing_key, body):
+    timestamp = str(int(time.time()))
+    signature = signing_key.sign(timestamp.encode() + body).signature.hex()
+    return {
+        'X-Signature-Ed25519': signature,
+        'X-Signature-Timestamp': timestamp,
+        'Content-Type': 'application/json',
+    }
+
+async def start_sink(port, counter):
+    async def webhook(request):
+        counter[request.method] += 1
+        return web.json_response({})
+    app = web.Application()
+    app.router.add_route('*', '/webhooks/{tail:.*}', webhook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+async def bench(args):
+    signing_key = SigningKey(bytes.fromhex(args.seed))
+    latencies = []
+    statuses = Counter()
+    webhooks = Counter()
+    runner = await start_sink(args.sink_port, webhooks) if args.sink_port else None
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def worker(session):
+        while not queue.empty():
+            i = queue.get_nowait()
+            body = json.dumps(build_payload(i, args)).encode()
+            start = time.perf_counter()
+            try:
+                async with session.post(args.url, data=body, headers=sign(signing_key, body)) as resp:
+                    data = await resp.json(content_type=None) if resp.status == 200 else None
+                    statuses[f"{resp.status}/type {data['type']}" if data else str(resp.status)] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    if runner:
+        await asyncio.sleep(args.drain)
+        await runner.cleanup()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s) at concurrency {args.concurrency}")
+    print(f"latency ms: mean {statistics.mean(latencies) * 1000:.1f}  p50 {pct(0.5):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}")
+    print("responses: " + ", ".join(f"{k}={v}" for k, v in sorted(statuses.items())))
+    if runner:
+        print("webhook calls: " + (", ".join(f"{k}={v}" for k, v in sorted(webhooks.items())) or "none"))
+
+def keygen(args):
+    signing_key = SigningKey.generate()
+    print(f"seed (client --seed):               {signing_key.encode().hex()}")
+    print(f"public key (DISCORD_PUBLIC_KEY):    {signing_key.verify_key.encode().hex()}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sign and post synthetic interactions to interactions.py")
+    sub = parser.add_subparsers(dest='action', required=True)
+    sub.add_parser('keygen', help="Generate an Ed25519 keypair for local testing")
+    b = sub.add_parser('bench', help="Post signed interactions and report throughput")
+    b.add_argument('--url', default='http://127.0.0.1:8080/interactions')
+    b.add_argument('--seed', required=True, help="Hex signing key seed from keygen")
+    b.add_argument('--requests', type=int, default=1000)
+    b.add_argument('--concurrency', type=int, default=50)
+    b.add_argument('--guild-id', type=int, default=1)
+    b.add_argument('--user-id', type=int, default=1)
+    b.add_argument('--permissions', type=int, default=0, help="Member permission bits (32 = Manage Server)")
+    b.add_argument('--sink-port', type=int, default=None, help="Serve a local webhook sink for deferred replies")
+    b.add_argument('--drain', type=float, default=1.0, help="Seconds to keep the sink up after the last request")
+    b.add_argument('--command', default='roll')
+    b.add_argument('options', nargs='*', help="Command options as name=value")
+    args = parser.parse_args(argv)
+    if args.action == 'keygen':
+        keygen(args)
+    else:
+        asyncio.run(bench(args))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+# interactions.py (for Web Service)
+# Receives slash commands over Discord's interactions endpoint instead of the gateway.
+# Run with: gunicorn -k gthread -w 4 --threads 8 -b 0.0.0.0:$PORT interactions:app
+# Set STATE_DB so every worker process shares the same campaign state. sqlite only
+# works on one host; scaling across hosts needs a networked data_manager.StateBackend.
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import sys
+import threading
+import aiohttp
+import discord
+from discord import app_commands
+from discord.ext import commands
+from dotenv import load_dotenv
+from flask import Flask, abort, jsonify, request
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+from utils import roll_history
+from utils.data_manager import StateBusyError
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler('bot.log')
+    ]
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+PUBLIC_KEY = os.getenv('DISCORD_PUBLIC_KEY')
+if not PUBLIC_KEY:
+    logger.error("DISCORD_PUBLIC_KEY not found")
+    raise ValueError("DISCORD_PUBLIC_KEY is required")
+API_BASE = os.getenv('DISCORD_API_BASE', 'https://discord.com/api/v10')
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '100'))
+INLINE_RESPONSE_TIMEOUT = float(os.getenv('INLINE_RESPONSE_TIMEOUT', '2.5'))
+
+# Cogs that work without a gateway connection. Once an Interactions Endpoint URL
+# is set, Discord stops sending slash commands over the gateway, so the commands
+# in UNAVAILABLE_COMMANDS do not work at all in this mode: they need a voice
+# connection or the roll history kept in main.py's process.
+EXTENSIONS = [
+    'commands.dnd_commands',
+    'commands.dm_commands',
+    'commands.character_commands',
+    'commands.notes_commands',
+]
+UNAVAILABLE_COMMANDS = {
+    'session': "it needs a voice connection",
+    'leave': "it needs a voice connection",
+    'rollstats': "roll history is not recorded in this mode",
+    'rollstats-party': "roll history is not recorded in this mode",
+}
+
+PING = 1
+APPLICATION_COMMAND = 2
+USER_OPTION = 6
+PONG = 1
+CHANNEL_MESSAGE_WITH_SOURCE = 4
+DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE = 5
+EPHEMERAL = 1 << 6
+
+_dispatcher_instance = None
+_dispatcher_lock = threading.Lock()
+
+def message_payload(content=None, embed=None, embeds=None, ephemeral=False):
+    payload = {}
+    if content is not None:
+        payload['content'] = str(content)
+    if embed is not None:
+        embeds = [embed]
+    if embeds:
+        payload['embeds'] = [e.to_dict() for e in embeds]
+    if ephemeral:
+        payload['flags'] = EPHEMERAL
+    return payload
+
+class HTTPUser:
+    def __init__(self, data):
+        self.id = int(data['id'])
+        self.name = data.get('username', '')
+        self.display_name = data.get('global_name') or self.name
+        self.mention = f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+class HTTPInteractionResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        self._interaction.resolve_initial({
+            'type': DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE,
+            'data': {'flags': EPHEMERAL} if ephemeral else {},
+        })
+        self._done = True
+
+    async def send_message(self, content=None, *, embed=None, embeds=None, ephemeral=False):
+        payload = message_payload(content, embed, embeds, ephemeral)
+        if not self._interaction.resolve_initial({'type': CHANNEL_MESSAGE_WITH_SOURCE, 'data': payload}):
+            # Already deferred, so the reply replaces the "thinking" placeholder.
+            payload.pop('flags', None)
+            await self._interaction.webhook('PATCH', '/messages/@original', payload)
+        self._done = True
+
+class HTTPFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, *, embed=None, embeds=None, ephemeral=False):
+        await self._interaction.webhook('POST', '', message_payload(content, embed, embeds, ephemeral))
+
+class HTTPInteraction:
+    """Quacks like discord.Interaction for cog callbacks served over HTTP."""
+
+    def __init__(self, dispatcher, payload):
+        self._dispatcher = dispatcher
+        self._initial = concurrent.futures.Future()
+        self._initial_lock = threading.Lock()
+        self.id = int(payload['id'])
+        self.application_id = int(payload['application_id'])
+        self.token = payload['token']
+        self.data = payload.get('data', {})
+        self.command_name = self.data.get('name')
+        self.guild_id = int(payload['guild_id']) if payload.get('guild_id') else None
+        self.channel_id = int(payload['channel_id']) if payload.get('channel_id') else None
+        self.guild = discord.Object(id=self.guild_id) if self.guild_id else None
+        member = payload.get('member')
+        self.user = HTTPUser(member['user'] if member else payload['user'])
+        self.permissions = discord.Permissions(int(member.get('permissions', 0)) if member else 0)
+        self.response = HTTPInteractionResponse(self)
+        self.followup = HTTPFollowup(self)
+
+    def options(self):
+        users = self.data.get('resolved', {}).get('users', {})
+        values = {}
+        for opt in self.data.get('options', []):
+            if 'value' not in opt:
+                continue
+            value = opt['value']
+            if opt.get('type') == USER_OPTION:
+                value = HTTPUser(users.get(value, {'id': value}))
+            values[opt['name']] = value
+        return values
+
+    def resolve_initial(self, response):
+        with self._initial_lock:
+            if self._initial.done():
+                return False
+            self._initial.set_result(response)
+            return True
+
+    def initial_response(self, timeout):
+        try:
+            return self._initial.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            self.resolve_initial({'type': DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE, 'data': {}})
+            return self._initial.result()
+
+    async def webhook(self, method, path, payload):
+        url = f"{API_BASE}/webhooks/{self.application_id}/{self.token}{path}"
+        try:
+            async with self._dispatcher.session.request(method, url, json=payload) as resp:
+                if resp.status >= 400:
+                    logger.error(f"Webhook {method} {path or '/'} failed: {resp.status} {await resp.text()}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Webhook {method} {path or '/'} failed: {e!r}")
+
+class InteractionDispatcher:
+    def __init__(self):
+        logger.info(f"Initializing InteractionDispatcher in process {os.getpid()}")
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='interaction-loop', daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.setup(), self.loop).result()
+
+    async def setup(self):
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE))
+        self.bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+        roll_history.RECORDING = False
+        for ext in EXTENSIONS:
+            await self.bot.load_extension(ext)
+        self.commands = {
+            cmd.name: cmd for cmd in self.bot.tree.get_commands()
+            if isinstance(cmd, app_commands.Command)
+        }
+        logger.info(f"Loaded {len(self.commands)} HTTP commands")
+
+    @classmethod
+    def get_instance(cls):
+        global _dispatcher_instance
+        with _dispatcher_lock:
+            if _dispatcher_instance is None:
+                _dispatcher_instance = cls()
+            return _dispatcher_instance
+
+    def handle(self, payload):
+        interaction = HTTPInteraction(self, payload)
+        future = asyncio.run_coroutine_threadsafe(self.dispatch(interaction), self.loop)
+        future.add_done_callback(self.log_failure)
+        return interaction.initial_response(INLINE_RESPONSE_TIMEOUT)
+
+    @staticmethod
+    def log_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("HTTP dispatch failed", exc_info=future.exception())
+
+    async def dispatch(self, interaction):
+        name = interaction.command_name
+        command = self.commands.get(name)
+        try:
+            if command is None:
+                await interaction.response.send_message(f"/{name} is not available on this server.", ephemeral=True)
+                return
+            if name in UNAVAILABLE_COMMANDS:
+                await interaction.response.send_message(
+                    f"/{name} is unavailable while the bot runs over HTTP: {UNAVAILABLE_COMMANDS[name]}.", ephemeral=True)
+                return
+            for check in command.checks:
+                if not await discord.utils.maybe_coroutine(check, interaction):
+                    raise app_commands.CheckFailure(f"Check failed for {name}")
+            await command.callback(command.binding, interaction, **interaction.options())
+        except app_commands.CheckFailure:
+            await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
+        except StateBusyError as e:
+            logger.warning(f"State busy in /{name}")
+            if interaction.response.is_done():
+                await interaction.followup.send(str(e), ephemeral=True)
+            else:
+                await interaction.response.send_message(str(e), ephemeral=True)
+        except Exception as e:
+            logger.error(f"HTTP command error in /{name}: {e}", exc_info=True)
+            if interaction.response.is_done():
+                await interaction.followup.send("An error occurred.", ephemeral=True)
+            else:
+                await interaction.response.send_message("An error occurred.", ephemeral=True)
+        finally:
+            if not interaction.response.is_done():
+                await interaction.response.send_message("Command produced no response.", ephemeral=True)
+
+app = Flask(__name__)
+verify_key = VerifyKey(bytes.fromhex(PUBLIC_KEY))
+
+@app.route('/interactions', methods=['POST'])
+def interactions():
+    signature = request.headers.get('X-Signature-Ed25519')
+    timestamp = request.headers.get('X-Signature-Timestamp')
+    body = request.get_data()
+    if not signature or not timestamp:
+        abort(401, 'missing request signature')
+    try:
+        verify_key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+    except (BadSignatureError, ValueError):
+        abort(401, 'invalid request signature')
+    payload = json.loads(body)
+    if payload.get('type') == PING:
+        return jsonify(type=PONG)
+    if payload.get('type') != APPLICATION_COMMAND:
+        abort(400, 'unsupported interaction type')
+    return jsonify(InteractionDispatcher.get_instance().handle(payload))
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify(status='ok', pid=os.getpid())
+
+if __name__ == '__main__':
+    logger.info("Starting interactions endpoint")
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '8080')), threaded=True)
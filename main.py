@@ -47,6 +47,7 @@ class MyBot(commands.Bot):
         try:
             await self.load_extension('commands.dnd_commands')
             await self.load_extension('commands.dm_commands')
+            await self.load_extension('commands.character_commands')
             await self.load_extension('commands.notes_commands')
             await self.load_extension('commands.music_commands')
             await self.load_extension('commands.moderation_commands')
@@ -0,0 +1,79 @@
+# soundboard_bench.py (CPU per stream: FFmpegPCMAudio vs cached Opus passthrough)
+# python soundboard_bench.py ambience/tavern.mp3 --seconds 60
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import discord
+from utils.soundboard import OpusCache, LoopingOpusSource, CROSSFADE_FRAMES, cached_packets
+
+FRAMES_PER_SECOND = 50
+
+def cpu_seconds():
+    own = time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own + children.ru_utime + children.ru_stime
+
+def measure(fn):
+    start = cpu_seconds()
+    frames = fn()
+    return cpu_seconds() - start, frames
+
+def ffmpeg_path(path, frames):
+    # What MusicCog.play does per guild: FFmpeg decodes to PCM, the voice client encodes to Opus.
+    source = discord.FFmpegPCMAudio(path, before_options='-stream_loop -1')
+    encoder = discord.opus.Encoder()
+    played = 0
+    try:
+        while played < frames:
+            pcm = source.read()
+            if not pcm:
+                break
+            encoder.encode(pcm, discord.opus.Encoder.SAMPLES_PER_FRAME)
+            played += 1
+    finally:
+        source.cleanup()
+    return played
+
+def passthrough_path(packets, frames):
+    source = LoopingOpusSource(packets)
+    for _ in range(frames):
+        source.read()
+    return frames
+
+def crossfade(packets):
+    source = LoopingOpusSource(packets)
+    source.crossfade_to(packets)
+    for _ in range(CROSSFADE_FRAMES):
+        source.read()
+    return CROSSFADE_FRAMES
+
+def report(label, cpu, frames):
+    audio_seconds = frames / FRAMES_PER_SECOND
+    print(f"{label:<22} {cpu * 1000:9.1f} ms CPU  {cpu * 1000 / audio_seconds:8.3f} ms CPU per audio second")
+    return cpu / audio_seconds
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare CPU per stream for ambience playback paths")
+    parser.add_argument('path', help="Local audio file to benchmark")
+    parser.add_argument('--seconds', type=int, default=60, help="Audio seconds to push through each path")
+    args = parser.parse_args(argv)
+    frames = args.seconds * FRAMES_PER_SECOND
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = OpusCache(cache_dir)
+        start = cpu_seconds()
+        opus_path = cache.get(args.path)
+        cpu = cpu_seconds() - start
+        print(f"{'one-time import':<22} {cpu * 1000:9.1f} ms CPU  ({os.path.getsize(opus_path)} bytes cached)")
+        packets = cached_packets(opus_path)
+
+        current = report('FFmpegPCMAudio', *measure(lambda: ffmpeg_path(args.path, frames)))
+        cached = report('Opus passthrough', *measure(lambda: passthrough_path(packets, frames)))
+        report('crossfade window', *measure(lambda: crossfade(packets)))
+    print(f"passthrough uses {cached / current * 100:.2f}% of the current path's CPU per stream")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# utils/character_sheet.py
+from utils.dice_parser import compile_notation
+
+ABILITIES = ('str', 'dex', 'con', 'int', 'wis', 'cha')
+ABILITY_NAMES = {
+    'strength': 'str', 'dexterity': 'dex', 'constitution': 'con',
+    'intelligence': 'int', 'wisdom': 'wis', 'charisma': 'cha',
+}
+SKILLS = (
+    ('acrobatics', 'dex'), ('animal_handling', 'wis'), ('arcana', 'int'),
+    ('athletics', 'str'), ('deception', 'cha'), ('history', 'int'),
+    ('insight', 'wis'), ('intimidation', 'cha'), ('investigation', 'int'),
+    ('medicine', 'wis'), ('nature', 'int'), ('perception', 'wis'),
+    ('performance', 'cha'), ('persuasion', 'cha'), ('religion', 'int'),
+    ('sleight_of_hand', 'dex'), ('stealth', 'dex'), ('survival', 'wis'),
+)
+SKILL_INDEX = {name: i for i, (name, _) in enumerate(SKILLS)}
+SKILL_ABILITY = tuple(ABILITIES.index(ability) for _, ability in SKILLS)
+ROLL_MODES = {'normal': '1d20', 'advantage': '2d20kh1', 'disadvantage': '2d20kl1'}
+
+def ability_index(name):
+    key = name.strip().lower()
+    key = ABILITY_NAMES.get(key, key)
+    if key not in ABILITIES:
+        raise ValueError(f"Unknown ability: {name}")
+    return ABILITIES.index(key)
+
+def skill_index(name):
+    key = name.strip().lower().replace(' ', '_')
+    if key not in SKILL_INDEX:
+        raise ValueError(f"Unknown skill: {name}")
+    return SKILL_INDEX[key]
+
+def parse_mask(text, lookup):
+    mask = 0
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        mask |= 1 << lookup(item)
+    return mask
+
+def signed(n):
+    return f"+{n}" if n >= 0 else str(n)
+
+def with_modifier(die, bonus):
+    return die if bonus == 0 else f"{die}{signed(bonus)}"
+
+class Attack:
+    __slots__ = ('name', 'ability', 'damage', 'proficient', 'bonus')
+
+    def __init__(self, name, ability, damage, proficient=True, bonus=0):
+        compile_notation(damage)
+        self.name = name
+        self.ability = ability_index(ability)
+        self.damage = damage
+        self.proficient = proficient
+        self.bonus = bonus
+
+    def to_dict(self):
+        return {'name': self.name, 'ability': ABILITIES[self.ability], 'damage': self.damage,
+                'proficient': self.proficient, 'bonus': self.bonus}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['ability'], data['damage'], data['proficient'], data['bonus'])
+
+class Derived:
+    __slots__ = ('mods', 'saves', 'skills', 'attacks')
+
+    def __init__(self, mods, saves, skills, attacks):
+        self.mods = mods
+        self.saves = saves
+        self.skills = skills
+        self.attacks = attacks
+
+class CharacterSheet:
+    """Ability scores and proficiencies with derived bonuses cached until a stat changes."""
+
+    __slots__ = ('scores', 'proficiency', 'skill_profs', 'expertise', 'save_profs', 'ac', 'attacks', '_derived')
+
+    def __init__(self):
+        self.scores = [10] * len(ABILITIES)
+        self.proficiency = 2
+        self.skill_profs = 0
+        self.expertise = 0
+        self.save_profs = 0
+        self.ac = 10
+        self.attacks = {}
+        self._derived = None
+
+    def update(self, scores=None, proficiency=None, skill_profs=None, expertise=None, save_profs=None, ac=None):
+        stats = (list(self.scores), self.proficiency, self.skill_profs, self.expertise, self.save_profs)
+        if scores:
+            for ability, value in scores.items():
+                self.scores[ability_index(ability)] = value
+        if proficiency is not None:
+            self.proficiency = proficiency
+        if skill_profs is not None:
+            self.skill_profs = skill_profs
+        if expertise is not None:
+            self.expertise = expertise
+        if save_profs is not None:
+            self.save_profs = save_profs
+        if ac is not None:
+            self.ac = ac
+        # AC feeds nothing derived, so only the stats above invalidate the cache.
+        if stats != (self.scores, self.proficiency, self.skill_profs, self.expertise, self.save_profs):
+            self._derived = None
+
+    def add_attack(self, attack):
+        self.attacks[attack.name.lower()] = attack
+        self._derived = None
+
+    def to_dict(self):
+        data = {
+            'scores': list(self.scores), 'proficiency': self.proficiency, 'skill_profs': self.skill_profs,
+            'expertise': self.expertise, 'save_profs': self.save_profs, 'ac': self.ac,
+            'attacks': [a.to_dict() for a in self.attacks.values()],
+        }
+        if self._derived is not None:
+            d = self._derived
+            data['derived'] = {'mods': d.mods, 'saves': d.saves, 'skills': d.skills, 'attacks': d.attacks}
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        sheet = cls()
+        sheet.scores = list(data['scores'])
+        sheet.proficiency = data['proficiency']
+        sheet.skill_profs = data['skill_profs']
+        sheet.expertise = data['expertise']
+        sheet.save_profs = data['save_profs']
+        sheet.ac = data['ac']
+        sheet.attacks = {a['name'].lower(): Attack.from_dict(a) for a in data['attacks']}
+        d = data.get('derived')
+        if d is not None:
+            attacks = {key: tuple(value) for key, value in d['attacks'].items()}
+            sheet._derived = Derived(tuple(d['mods']), tuple(d['saves']), tuple(d['skills']), attacks)
+        return sheet
+
+    def derived(self):
+        if self._derived is None:
+            prof = self.proficiency
+            mods = tuple((score - 10) // 2 for score in self.scores)
+            saves = tuple(mod + (prof if self.save_profs >> i & 1 else 0) for i, mod in enumerate(mods))
+            skills = tuple(
+                mods[ability] + prof * (2 if self.expertise >> i & 1 else self.skill_profs >> i & 1)
+                for i, ability in enumerate(SKILL_ABILITY)
+            )
+            attacks = {
+                key: (mods[a.ability] + (prof if a.proficient else 0) + a.bonus, with_modifier(a.damage, mods[a.ability]))
+                for key, a in self.attacks.items()
+            }
+            self._derived = Derived(mods, saves, skills, attacks)
+        return self._derived
+
+    def check_roll(self, skill, mode='normal'):
+        return compile_notation(with_modifier(ROLL_MODES[mode], self.derived().skills[skill_index(skill)]))
+
+    def save_roll(self, ability, mode='normal'):
+        return compile_notation(with_modifier(ROLL_MODES[mode], self.derived().saves[ability_index(ability)]))
+
+    def attack_rolls(self, attack=None, mode='normal'):
+        attacks = self.derived().attacks
+        if not attacks:
+            raise ValueError("No attacks on this sheet")
+        key = attack.lower() if attack else next(iter(attacks))
+        if key not in attacks:
+            raise ValueError(f"Unknown attack: {attack}")
+        to_hit, damage = attacks[key]
+        return self.attacks[key].name, compile_notation(with_modifier(ROLL_MODES[mode], to_hit)), compile_notation(damage)
@@ -1,131 +1,292 @@
 # utils/data_manager.py
+import datetime
+import itertools
+import json
+import os
+import sqlite3
 import threading
 from collections import defaultdict
-import datetime
+from contextlib import contextmanager
+from utils.character_sheet import CharacterSheet
+
+# Set STATE_DB to a sqlite path to share state between worker processes on one host.
+STATE_DB = os.getenv('STATE_DB')
+# How long a writer waits for another process's write lock before giving up.
+STATE_DB_TIMEOUT = float(os.getenv('STATE_DB_TIMEOUT', '5'))
+BUSY_MESSAGE = "Campaign state is busy, please try again."
+
+class StateBusyError(Exception):
+    pass
+
+class StateBackend:
+    """Campaign state as small per-guild entries: one per character, sheet, note, quest, etc.
+
+    Entries are grouped by kind and keep insertion order; values are JSON-compatible.
+    A networked store can be plugged in with set_backend to span several hosts.
+    """
+
+    def transaction(self, guild_id):
+        """Context manager making the reads and writes inside it atomic."""
+        raise NotImplementedError
+
+    def get(self, guild_id, kind, key):
+        raise NotImplementedError
+
+    def items(self, guild_id, kind):
+        """Return [(key, value), ...] for a kind, oldest first."""
+        raise NotImplementedError
+
+    def put(self, guild_id, kind, key, value):
+        """Insert or update an entry; an update keeps its position."""
+        raise NotImplementedError
+
+    def append(self, guild_id, kind, value):
+        raise NotImplementedError
+
+    def delete(self, guild_id, kind, key=None):
+        """Delete one entry, or every entry of the kind when key is None."""
+        raise NotImplementedError
+
+class MemoryBackend(StateBackend):
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data = {}
+        self.next_id = itertools.count()
+
+    def _entries(self, guild_id, kind):
+        return self.data.setdefault(guild_id, {}).setdefault(kind, {})
+
+    @contextmanager
+    def transaction(self, guild_id):
+        with self.lock:
+            yield
+
+    def get(self, guild_id, kind, key):
+        with self.lock:
+            return self.data.get(guild_id, {}).get(kind, {}).get(key)
+
+    def items(self, guild_id, kind):
+        with self.lock:
+            return list(self.data.get(guild_id, {}).get(kind, {}).items())
+
+    def put(self, guild_id, kind, key, value):
+        with self.lock:
+            self._entries(guild_id, kind)[key] = value
+
+    def append(self, guild_id, kind, value):
+        with self.lock:
+            self._entries(guild_id, kind)[next(self.next_id)] = value
+
+    def delete(self, guild_id, kind, key=None):
+        with self.lock:
+            entries = self.data.get(guild_id, {})
+            if key is None:
+                entries.pop(kind, None)
+            else:
+                entries.get(kind, {}).pop(key, None)
 
-LOCK = threading.Lock()
-DATA = {}
+class SqliteBackend(StateBackend):
+    """Shares state between worker processes through a WAL-mode sqlite file.
 
-def default_guild_data():
-    return {
-        'characters': {},
-        'initiative': [],
-        'notes': [],
-        'quests': defaultdict(list),
-        'location': None,
-        'inventory': {},
-        'session_voice': None,
-    }
+    sqlite locking only works on a local filesystem, so every worker must run on
+    the same host; scaling across hosts needs a networked backend.
+    """
+
+    def __init__(self, path, timeout=STATE_DB_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, since commands run state calls in worker threads.
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, guild_id INTEGER NOT NULL, kind TEXT NOT NULL, '
+                'key TEXT, value TEXT NOT NULL, UNIQUE (guild_id, kind, key))'
+            )
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def _execute(self, sql, params=()):
+        try:
+            return self._connection().execute(sql, params)
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                raise StateBusyError(BUSY_MESSAGE) from e
+            raise
+
+    @contextmanager
+    def transaction(self, guild_id):
+        self._execute('BEGIN IMMEDIATE')
+        conn = self._connection()
+        try:
+            yield
+            self._execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+
+    def get(self, guild_id, kind, key):
+        row = self._execute('SELECT value FROM entries WHERE guild_id = ? AND kind = ? AND key = ?',
+                            (guild_id, kind, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def items(self, guild_id, kind):
+        rows = self._execute('SELECT key, value FROM entries WHERE guild_id = ? AND kind = ? ORDER BY id',
+                             (guild_id, kind)).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def put(self, guild_id, kind, key, value):
+        self._execute(
+            'INSERT INTO entries (guild_id, kind, key, value) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (guild_id, kind, key) DO UPDATE SET value = excluded.value',
+            (guild_id, kind, key, json.dumps(value)),
+        )
+
+    def append(self, guild_id, kind, value):
+        # A NULL key never conflicts, so appended entries are ordered by id alone.
+        self._execute('INSERT INTO entries (guild_id, kind, key, value) VALUES (?, ?, NULL, ?)',
+                      (guild_id, kind, json.dumps(value)))
+
+    def delete(self, guild_id, kind, key=None):
+        if key is None:
+            self._execute('DELETE FROM entries WHERE guild_id = ? AND kind = ?', (guild_id, kind))
+        else:
+            self._execute('DELETE FROM entries WHERE guild_id = ? AND kind = ? AND key = ?', (guild_id, kind, key))
+
+BACKEND = SqliteBackend(STATE_DB) if STATE_DB else MemoryBackend()
+
+def set_backend(backend):
+    global BACKEND
+    BACKEND = backend
+
+def _sheet(guild_id, name):
+    data = BACKEND.get(guild_id, 'sheets', name)
+    return CharacterSheet.from_dict(data) if data is not None else None
+
+def _put_sheet(guild_id, name, sheet):
+    # Store the derived stats too, so readers in other processes skip recomputing them.
+    sheet.derived()
+    BACKEND.put(guild_id, 'sheets', name, sheet.to_dict())
 
 def add_character(guild_id, name, max_hp):
-    with LOCK:
-        data = DATA.setdefault(guild_id, default_guild_data())
-        if name in data['characters']:
+    with BACKEND.transaction(guild_id):
+        if BACKEND.get(guild_id, 'characters', name) is not None:
             raise ValueError("Character already exists")
-        data['characters'][name] = {'hp': max_hp, 'max_hp': max_hp}
+        BACKEND.put(guild_id, 'characters', name, {'hp': max_hp, 'max_hp': max_hp})
 
 def get_character(guild_id, name):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return data['characters'].get(name)
+    return BACKEND.get(guild_id, 'characters', name)
 
 def get_all_characters(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return data['characters'].copy()
+    return dict(BACKEND.items(guild_id, 'characters'))
+
+def update_sheet(guild_id, name, **changes):
+    with BACKEND.transaction(guild_id):
+        if BACKEND.get(guild_id, 'characters', name) is None:
+            raise ValueError("Character not found")
+        sheet = _sheet(guild_id, name) or CharacterSheet()
+        sheet.update(**changes)
+        _put_sheet(guild_id, name, sheet)
+        return sheet
+
+def add_sheet_attack(guild_id, name, attack):
+    with BACKEND.transaction(guild_id):
+        if BACKEND.get(guild_id, 'characters', name) is None:
+            raise ValueError("Character not found")
+        sheet = _sheet(guild_id, name) or CharacterSheet()
+        sheet.add_attack(attack)
+        _put_sheet(guild_id, name, sheet)
+        return sheet
+
+def get_sheet(guild_id, name):
+    return _sheet(guild_id, name)
+
+def resolve_rolls(guild_id, names, resolve):
+    """Roll resolve(sheet) for each named character (all sheets if names is None) in one pass."""
+    if names is None:
+        sheets = dict(BACKEND.items(guild_id, 'sheets'))
+        names = list(sheets)
+    else:
+        sheets = {name: BACKEND.get(guild_id, 'sheets', name) for name in names}
+    results = []
+    for name in names:
+        if sheets[name] is None:
+            raise ValueError(f"No character sheet for {name}")
+        compiled = resolve(CharacterSheet.from_dict(sheets[name]))
+        total, details = compiled.roll()
+        results.append((name, compiled.notation, total, details))
+    return results
+
+def _update_character(guild_id, name, change):
+    with BACKEND.transaction(guild_id):
+        char = BACKEND.get(guild_id, 'characters', name)
+        if char is not None:
+            char['hp'] = max(0, min(change(char), char['max_hp']))
+            BACKEND.put(guild_id, 'characters', name, char)
 
 def update_hp(guild_id, name, new_hp):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        if name in data['characters']:
-            data['characters'][name]['hp'] = min(new_hp, data['characters'][name]['max_hp'])
-            if data['characters'][name]['hp'] < 0:
-                data['characters'][name]['hp'] = 0
+    _update_character(guild_id, name, lambda char: new_hp)
 
 def damage_character(guild_id, name, amount):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        if name in data['characters']:
-            data['characters'][name]['hp'] -= amount
-            if data['characters'][name]['hp'] < 0:
-                data['characters'][name]['hp'] = 0
+    _update_character(guild_id, name, lambda char: char['hp'] - amount)
 
 def heal_character(guild_id, name, amount):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        if name in data['characters']:
-            data['characters'][name]['hp'] += amount
-            if data['characters'][name]['hp'] > data['characters'][name]['max_hp']:
-                data['characters'][name]['hp'] = data['characters'][name]['max_hp']
+    _update_character(guild_id, name, lambda char: char['hp'] + amount)
 
 def add_initiative(guild_id, name, roll):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        data['initiative'].append({'name': name, 'roll': roll})
-        data['initiative'].sort(key=lambda x: x['roll'], reverse=True)
+    BACKEND.append(guild_id, 'initiative', {'name': name, 'roll': roll})
 
 def get_initiative(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return data['initiative'].copy()
+    return sorted((entry for _, entry in BACKEND.items(guild_id, 'initiative')), key=lambda x: x['roll'], reverse=True)
 
 def clear_initiative(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        data['initiative'] = []
+    BACKEND.delete(guild_id, 'initiative')
 
 def add_note(guild_id, note):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        time = datetime.datetime.now().isoformat()
-        data['notes'].append({'time': time, 'note': note})
+    time = datetime.datetime.now().isoformat()
+    BACKEND.append(guild_id, 'notes', {'time': time, 'note': note})
 
 def get_notes(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return data['notes'].copy()
+    return [note for _, note in BACKEND.items(guild_id, 'notes')]
 
 def add_or_update_quest(guild_id, name, desc, status):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        for st, qlist in data['quests'].items():
-            qlist[:] = [q for q in qlist if q['name'] != name]
-        data['quests'][status].append({'name': name, 'desc': desc})
+    with BACKEND.transaction(guild_id):
+        # Delete first so an updated quest moves to the end of its new status.
+        BACKEND.delete(guild_id, 'quests', name)
+        BACKEND.put(guild_id, 'quests', name, {'desc': desc, 'status': status})
 
 def get_quests(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return {k: v.copy() for k, v in data['quests'].items()}
+    quests = defaultdict(list)
+    for name, quest in BACKEND.items(guild_id, 'quests'):
+        quests[quest['status']].append({'name': name, 'desc': quest['desc']})
+    return dict(quests)
 
 def set_location(guild_id, loc):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        data['location'] = loc
+    BACKEND.put(guild_id, 'meta', 'location', loc)
 
 def get_location(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return data['location']
+    return BACKEND.get(guild_id, 'meta', 'location')
 
 def add_inventory(guild_id, item, qty, desc):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        if item in data['inventory']:
-            data['inventory'][item]['qty'] += qty
+    with BACKEND.transaction(guild_id):
+        entry = BACKEND.get(guild_id, 'inventory', item)
+        if entry is not None:
+            entry['qty'] += qty
         else:
-            data['inventory'][item] = {'qty': qty, 'desc': desc}
+            entry = {'qty': qty, 'desc': desc}
+        BACKEND.put(guild_id, 'inventory', item, entry)
 
 def get_inventory(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return data['inventory'].copy()
+    return dict(BACKEND.items(guild_id, 'inventory'))
 
 def set_session_voice(guild_id, channel_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        data['session_voice'] = channel_id
+    BACKEND.put(guild_id, 'meta', 'session_voice', channel_id)
 
 def get_session_voice(guild_id):
-    with LOCK:
-        data = DATA.get(guild_id, default_guild_data())
-        return data['session_voice']
\ No newline at end of file
+    return BACKEND.get(guild_id, 'meta', 'session_voice')
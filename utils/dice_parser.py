@@ -1,9 +1,51 @@
 # utils/dice_parser.py
 import re
 import random
+from numbers import Real
+from functools import lru_cache
 
-def parse_and_roll(notation):
-    details = []
+DICE_RE = re.compile(r'(\d+)d(\d+)(kh|kl)?(\d+)?', re.IGNORECASE)
+# Keeps every roll's faces within one embed field and bounds what history records.
+MAX_DICE = 100
+
+class CompiledRoll:
+    __slots__ = ('notation', 'groups', 'code')
+
+    def __init__(self, notation, groups, code):
+        self.notation = notation
+        self.groups = groups
+        self.code = code
+
+    def roll(self):
+        details = []
+        names = {}
+        for i, (expression, n, sides, keep_type, keep_num) in enumerate(self.groups):
+            rolls = [random.randint(1, sides) for _ in range(n)]
+            kept = rolls
+            if keep_type == 'kh':
+                kept = sorted(rolls, reverse=True)[:keep_num]
+            elif keep_type == 'kl':
+                kept = sorted(rolls)[:keep_num]
+            total = sum(kept)
+            details.append({
+                'expression': expression,
+                'sides': sides,
+                'rolls': rolls,
+                'kept': kept,
+                'total': total
+            })
+            names[f'_d{i}'] = total
+        try:
+            result = eval(self.code, {"__builtins__": {}}, names)
+        except:
+            raise ValueError("Invalid dice notation")
+        if not isinstance(result, Real):
+            raise ValueError("Invalid dice notation")
+        return result, details
+
+@lru_cache(maxsize=1024)
+def compile_notation(notation):
+    groups = []
     def replace_dice(match):
         n = int(match.group(1))
         sides = int(match.group(2))
@@ -16,27 +58,20 @@ def parse_and_roll(notation):
                 raise ValueError("Keep number required")
         if keep_type and keep_num > n:
             raise ValueError("Keep number exceeds dice count")
-        rolls = [random.randint(1, sides) for _ in range(n)]
-        original_rolls = rolls.copy()
         if keep_type:
-            if keep_type == 'kh':
-                rolls = sorted(rolls, reverse=True)[:keep_num]
-            elif keep_type == 'kl':
-                rolls = sorted(rolls)[:keep_num]
-            else:
+            keep_type = keep_type.lower()
+            if keep_type not in ('kh', 'kl'):
                 raise ValueError("Invalid keep type")
-        total = sum(rolls)
-        details.append({
-            'expression': match.group(0),
-            'rolls': original_rolls,
-            'kept': rolls if keep_type else original_rolls,
-            'total': total
-        })
-        return str(total)
-    dice_re = re.compile(r'(\d+)d(\d+)(kh|kl)?(\d+)?', re.IGNORECASE)
-    new_notation = dice_re.sub(replace_dice, notation)
+        groups.append((match.group(0), n, sides, keep_type, keep_num))
+        return f'_d{len(groups) - 1}'
+    expression = DICE_RE.sub(replace_dice, notation)
+    if sum(group[1] for group in groups) > MAX_DICE:
+        raise ValueError(f"Too many dice: at most {MAX_DICE} per roll")
     try:
-        result = eval(new_notation, {"__builtins__": {}}, {})
+        code = compile(expression, '<dice>', 'eval')
     except:
         raise ValueError("Invalid dice notation")
-    return result, details
\ No newline at end of file
+    return CompiledRoll(notation, tuple(groups), code)
+
+def parse_and_roll(notation):
+    return compile_notation(notation).roll()
@@ -0,0 +1,261 @@
+# utils/roll_history.py
+import math
+import os
+import struct
+import threading
+from array import array
+import numpy as np
+
+LOCK = threading.Lock()
+HISTORY = {}
+
+MAX_ROLLS = int(os.getenv('ROLL_HISTORY_MAX_ROLLS', '250000'))
+MAX_DICE = int(os.getenv('ROLL_HISTORY_MAX_DICE', '2000000'))
+# Set ROLL_HISTORY_DIR to append evicted history to disk instead of dropping it.
+SPILL_DIR = os.getenv('ROLL_HISTORY_DIR')
+SPILL_CHUNK = 4096
+# Each spill file rotates to <name>.1 at this size, so at most two are kept.
+SPILL_MAX_BYTES = int(os.getenv('ROLL_HISTORY_SPILL_MAX_MB', '32')) * 1024 * 1024
+MAX_SIDES = 0xFFFF
+# History is per process; the HTTP endpoint turns recording off since no worker can serve stats.
+RECORDING = True
+
+# Codes are array typecodes, except 'Ns' which stores N-byte strings, zero padded.
+NOTATION_BYTES = 32
+ROLL_COLUMNS = (('user', 'Q'), ('session', 'H'), ('notation', f'{NOTATION_BYTES}s'), ('total', 'd'), ('dice', 'H'))
+DIE_COLUMNS = (('user', 'Q'), ('session', 'H'), ('sides', 'H'), ('face', 'H'))
+
+def _width(code):
+    return int(code[:-1]) if code.endswith('s') else 0
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+class Ring:
+    """Fixed-capacity ring of parallel typed-array columns."""
+
+    def __init__(self, columns, capacity, spill_path=None, spill_max_bytes=SPILL_MAX_BYTES):
+        self.names = [name for name, _ in columns]
+        self.widths = [_width(code) for _, code in columns]
+        self.dtypes = [np.dtype(f'S{width}' if width else code) for (_, code), width in zip(columns, self.widths)]
+        self.columns = [bytearray() if width else array(code) for (_, code), width in zip(columns, self.widths)]
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.rotations = 0
+        self.length = 0
+        self.pos = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, row):
+        if self.length < self.capacity:
+            for col, width, value in zip(self.columns, self.widths, row):
+                if width:
+                    col += value
+                else:
+                    col.append(value)
+            self.length += 1
+            return
+        if self.spill_path and self.pos % SPILL_CHUNK == 0:
+            self.spill(self.pos, min(self.pos + SPILL_CHUNK, self.capacity))
+        for col, width, value in zip(self.columns, self.widths, row):
+            if width:
+                col[self.pos * width:(self.pos + 1) * width] = value
+            else:
+                col[self.pos] = value
+        self.pos = (self.pos + 1) % self.capacity
+
+    def spill(self, start, stop):
+        if _size(self.spill_path) >= self.spill_max_bytes:
+            os.replace(self.spill_path, self.spill_path + '.1')
+            self.rotations += 1
+        # Each chunk is a little-endian uint32 row count followed by every column's raw bytes.
+        with open(self.spill_path, 'ab') as f:
+            f.write(struct.pack('<I', stop - start))
+            for col, width in zip(self.columns, self.widths):
+                f.write(col[start * width:stop * width] if width else col[start:stop].tobytes())
+
+    def spill_snapshot(self):
+        """Sizes of the spill files now; take it with the in-memory rows so none are counted twice."""
+        if not self.spill_path:
+            return None
+        return self.rotations, _size(self.spill_path + '.1'), _size(self.spill_path)
+
+    def read_spilled(self, snapshot):
+        """Yield each chunk spilled before snapshot as {column: numpy array}, oldest first."""
+        rotations, rotated_size, current_size = snapshot
+        if self.rotations == rotations:
+            files = [(self.spill_path + '.1', rotated_size), (self.spill_path, current_size)]
+        else:
+            # Rotated since the snapshot: the old current file is now the .1 file.
+            files = [(self.spill_path + '.1', current_size)]
+        for path, limit in files:
+            try:
+                with open(path, 'rb') as f:
+                    yield from self._read_chunks(f, limit)
+            except FileNotFoundError:
+                continue
+
+    def _read_chunks(self, f, limit):
+        row_bytes = sum(dtype.itemsize for dtype in self.dtypes)
+        while limit >= 4:
+            header = f.read(4)
+            if len(header) < 4:
+                return
+            rows = struct.unpack('<I', header)[0]
+            size = rows * row_bytes
+            if 4 + size > limit:
+                return
+            data = f.read(size)
+            if len(data) < size:
+                return
+            limit -= 4 + size
+            chunk, offset = {}, 0
+            for name, dtype in zip(self.names, self.dtypes):
+                chunk[name] = np.frombuffer(data, dtype=dtype, count=rows, offset=offset)
+                offset += rows * dtype.itemsize
+            yield chunk
+
+class RollHistory:
+    def __init__(self, guild_id, max_rolls=MAX_ROLLS, max_dice=MAX_DICE, spill_dir=SPILL_DIR):
+        self.guild_id = guild_id
+        self.session = 0
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.rolls = Ring(ROLL_COLUMNS, max_rolls, self._spill_path('rolls.bin'))
+        self.dice = Ring(DIE_COLUMNS, max_dice, self._spill_path('dice.bin'))
+
+    def _spill_path(self, kind):
+        if not self.spill_dir:
+            return None
+        # Stable across restarts so old history stays readable; only the gateway bot records.
+        return os.path.join(self.spill_dir, f"{self.guild_id}.{kind}")
+
+    def record(self, user_id, notation, total, details):
+        user = int(user_id)
+        # Truncated to a fixed width so stored notations cost the same however varied they are.
+        notation = notation.replace(' ', '').lower().encode()[:NOTATION_BYTES].ljust(NOTATION_BYTES, b'\0')
+        dice = 0
+        for det in details:
+            sides = det.get('sides', 0)
+            if not 0 < sides <= MAX_SIDES:
+                continue
+            for face in det['rolls']:
+                self.dice.append((user, self.session, sides, face))
+                dice += 1
+        total = float(total) if abs(total) <= 1e308 else (math.inf if total > 0 else -math.inf)
+        self.rolls.append((user, self.session, notation, total, min(dice, MAX_SIDES)))
+
+def get_history(guild_id):
+    history = HISTORY.get(guild_id)
+    if history is None:
+        history = HISTORY[guild_id] = RollHistory(guild_id)
+    return history
+
+def record_roll(guild_id, user_id, notation, total, details):
+    if not RECORDING:
+        return
+    with LOCK:
+        get_history(guild_id).record(user_id, notation, total, details)
+
+def start_session(guild_id):
+    with LOCK:
+        history = get_history(guild_id)
+        history.session = (history.session + 1) % (MAX_SIDES + 1)
+
+def _select_dice(dice, sides, session):
+    # Zero-copy views over the live columns; only the matching rows are copied out.
+    columns = dict(zip(dice.names, (np.frombuffer(col, dtype=col.typecode) for col in dice.columns)))
+    mask = columns['sides'] == sides
+    if session is not None:
+        mask &= columns['session'] == session
+    return columns['user'][mask], columns['face'][mask]
+
+def user_face_counts(guild_id, sides, session_only=False):
+    """Return {user_id: [count of face 1, ..., count of face sides]} for dN rolls."""
+    if not 2 <= sides <= MAX_SIDES:
+        raise ValueError(f"Die size must be between 2 and {MAX_SIDES}.")
+    with LOCK:
+        history = get_history(guild_id)
+        user, face = _select_dice(history.dice, sides, history.session if session_only else None)
+        # Session numbers restart with the process, so session stats only use rows still in memory.
+        snapshot = None if session_only else history.dice.spill_snapshot()
+    if snapshot:
+        users, faces = [user], [face]
+        for chunk in history.dice.read_spilled(snapshot):
+            mask = chunk['sides'] == sides
+            users.append(chunk['user'][mask])
+            faces.append(chunk['face'][mask])
+        user, face = np.concatenate(users), np.concatenate(faces)
+    # Only users who rolled this die get a row, so memory follows the stored dice.
+    present, row = np.unique(user, return_inverse=True)
+    width = sides + 1
+    counts = np.bincount(row * width + face.astype(np.int64), minlength=len(present) * width).reshape(-1, width)[:, 1:]
+    return {int(u): [int(c) for c in counts[i]] for i, u in enumerate(present)}
+
+def face_counts(guild_id, sides, user_id=None, session_only=False):
+    per_user = user_face_counts(guild_id, sides, session_only)
+    if user_id is not None:
+        return per_user.get(user_id, [0] * sides)
+    return [sum(faces) for faces in zip(*per_user.values())] or [0] * sides
+
+def chi_square_p_value(statistic, df):
+    """Upper tail of the chi-square distribution, via the regularized gamma function."""
+    a, x = df / 2.0, statistic / 2.0
+    if x <= 0:
+        return 1.0
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        ap = a
+        for _ in range(1000):
+            ap += 1
+            term *= x / ap
+            total += term
+            if abs(term) < abs(total) * 1e-14:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = d if abs(d) > tiny else tiny
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-14:
+            break
+    return math.exp(log_prefix) * h
+
+def summarize(counts):
+    sides = len(counts)
+    n = sum(counts)
+    if n == 0:
+        return {'dice': 0, 'sides': sides}
+    expected = n / sides
+    chi2 = sum((c - expected) ** 2 for c in counts) / expected
+    return {
+        'dice': n,
+        'sides': sides,
+        'mean': sum(face * c for face, c in enumerate(counts, 1)) / n,
+        'expected_mean': (sides + 1) / 2,
+        'max_rate': counts[-1] / n,
+        'min_rate': counts[0] / n,
+        'chi2': chi2,
+        'p_value': chi_square_p_value(chi2, sides - 1) if sides > 1 else 1.0,
+        # The chi-square approximation needs roughly five expected hits per face.
+        'conclusive': expected >= 5,
+    }
@@ -0,0 +1,280 @@
+# utils/soundboard.py
+import collections
+import hashlib
+import json
+import logging
+import os
+import struct
+import subprocess
+import threading
+import time
+from array import array
+import discord
+from discord.oggparse import OggStream
+
+AMBIENCE_DIR = os.getenv('AMBIENCE_DIR', 'ambience')
+CACHE_DIR = os.getenv('AMBIENCE_CACHE_DIR', 'ambience_cache')
+CACHE_MAX_BYTES = int(os.getenv('AMBIENCE_CACHE_MAX_MB', '512')) * 1024 * 1024
+# Decoded packet lists kept in memory, shared by every guild playing the same loop.
+MEMORY_MAX_BYTES = int(os.getenv('AMBIENCE_MEMORY_MAX_MB', '128')) * 1024 * 1024
+AUDIO_EXTENSIONS = {'.mp3', '.ogg', '.opus', '.wav', '.flac', '.m4a'}
+OPUS_BITRATE = '96k'
+CROSSFADE_FRAMES = 100  # 2 seconds of 20ms Opus frames
+OGG_HEADERS = (b'OpusHead', b'OpusTags')
+FRAME_BYTES = 3840  # 20ms of 48kHz stereo s16le
+PREROLL_FRAMES = 3
+
+def list_scenes(directory=AMBIENCE_DIR):
+    if not os.path.isdir(directory):
+        return {}
+    scenes = {}
+    for filename in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(filename)
+        if ext.lower() in AUDIO_EXTENSIONS:
+            scenes[name.lower()] = os.path.join(directory, filename)
+    return scenes
+
+def ffmpeg(*args):
+    subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-y', *args], check=True)
+
+def encode_loop(source_path, dest_path):
+    """Encode source_path into a file of Opus packets that loops seamlessly.
+
+    The audio is trimmed to whole 20ms frames and encoded three times back to
+    back, and only the middle copy's packets are kept. That drops the encoder's
+    pre-skip priming and the final packet's padding, and the packet before the
+    first kept one was encoded from the same audio as the last kept one, so the
+    wrap-around continues the decoder state instead of clicking.
+    """
+    pcm_path = dest_path + '.pcm'
+    ogg_path = dest_path + '.ogg'
+    try:
+        ffmpeg('-i', source_path, '-vn', '-f', 's16le', '-ar', '48000', '-ac', '2', pcm_path)
+        frames = os.path.getsize(pcm_path) // FRAME_BYTES
+        if frames == 0:
+            raise ValueError(f"{source_path} is shorter than one Opus frame")
+        os.truncate(pcm_path, frames * FRAME_BYTES)
+        ffmpeg('-stream_loop', '2', '-f', 's16le', '-ar', '48000', '-ac', '2', '-i', pcm_path,
+               '-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-frame_duration', '20',
+               '-application', 'audio', '-f', 'ogg', ogg_path)
+        with open(ogg_path, 'rb') as f:
+            packets = [p for p in OggStream(f).iter_packets() if not p.startswith(OGG_HEADERS)]
+        loop = packets[frames:2 * frames]
+        if len(loop) != frames:
+            raise ValueError(f"Expected {frames} loop packets from {source_path}, got {len(loop)}")
+        with open(dest_path, 'wb') as f:
+            for packet in loop:
+                f.write(struct.pack('<H', len(packet)))
+                f.write(packet)
+    finally:
+        for path in (pcm_path, ogg_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+class OpusCache:
+    """Size-bounded LRU of pre-encoded Opus loops, shared by every guild."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.index_path = os.path.join(directory, 'index.json')
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._load_index()
+        self._sweep()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        return {k: v for k, v in index.items() if os.path.exists(self.path_for(k))}
+
+    def _sweep(self):
+        # Files the index doesn't track (a crash mid-transcode, or before the index
+        # was saved) would never be evicted, so remove them at startup.
+        tracked = {os.path.basename(self.path_for(key)) for key in self.index}
+        tracked.add(os.path.basename(self.index_path))
+        for filename in os.listdir(self.directory):
+            if filename not in tracked:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    continue
+                logging.info(f"Removed untracked {filename} from ambience cache")
+
+    def _save_index(self):
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+    def key_for(self, source_path):
+        st = os.stat(source_path)
+        ident = f"{os.path.realpath(source_path)}:{st.st_size}:{st.st_mtime_ns}"
+        return hashlib.sha256(ident.encode()).hexdigest()[:32]
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + '.opus')
+
+    def total_bytes(self):
+        return sum(entry['size'] for entry in self.index.values())
+
+    def get(self, source_path):
+        """Return the cached Opus loop for source_path, encoding it on first use."""
+        key = self.key_for(source_path)
+        path = self.path_for(key)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry and os.path.exists(path):
+                entry['used'] = time.time()
+                self._save_index()
+                return path
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        logging.info(f"Transcoding {source_path} into ambience cache")
+        try:
+            encode_loop(source_path, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        with self.lock:
+            self.index[key] = {'source': source_path, 'size': os.path.getsize(path), 'used': time.time()}
+            self._evict(keep=key)
+            self._save_index()
+        return path
+
+    def _evict(self, keep):
+        total = self.total_bytes()
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]['used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+            total -= entry['size']
+            del self.index[key]
+            logging.info(f"Evicted {entry['source']} from ambience cache")
+
+def load_packets(path):
+    packets = []
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(2)
+            if len(header) < 2:
+                break
+            packets.append(f.read(struct.unpack('<H', header)[0]))
+    packets = tuple(packets)
+    if not packets:
+        raise ValueError(f"No Opus audio in {path}")
+    return packets
+
+class PacketCache:
+    """LRU of loaded packet lists, bounded by the total size of their packets."""
+
+    def __init__(self, max_bytes=MEMORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        key = (path, os.stat(path).st_mtime_ns)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[0]
+        packets = load_packets(path)
+        size = sum(map(len, packets))
+        with self.lock:
+            if key not in self.entries and size <= self.max_bytes:
+                self.entries[key] = (packets, size)
+                self.total += size
+                while self.total > self.max_bytes:
+                    _, (_, evicted) = self.entries.popitem(last=False)
+                    self.total -= evicted
+        return packets
+
+PACKET_CACHE = PacketCache()
+
+def cached_packets(path):
+    return PACKET_CACHE.get(path)
+
+def _mix(old_pcm, new_pcm, gain):
+    old, new = array('h', old_pcm), array('h', new_pcm)
+    keep = 1.0 - gain
+    return array('h', (int(a * keep + b * gain) for a, b in zip(old, new))).tobytes()
+
+class LoopingOpusSource(discord.AudioSource):
+    """Plays cached Opus packets without transcoding, looping gaplessly.
+
+    Only a crossfade decodes audio, and only for the frames that overlap.
+    """
+
+    def __init__(self, packets, name=None, crossfade_frames=CROSSFADE_FRAMES):
+        self.packets = packets
+        self.name = name
+        self.crossfade_frames = crossfade_frames
+        self._pos = 0
+        self._next = None
+        self._queued = None
+        self._lock = threading.Lock()
+
+    def is_opus(self):
+        return True
+
+    def crossfade_to(self, packets, name=None):
+        with self._lock:
+            if self._next is not None:
+                # Finish the running fade first; only the latest request is kept.
+                self._queued = (packets, name)
+                return
+            self._start_fade(packets, name)
+
+    def _start_fade(self, packets, name):
+        old_decoder = discord.opus.Decoder()
+        new_decoder = discord.opus.Decoder()
+        encoder = discord.opus.Encoder()
+        # Prime the codecs with the packets just before each stream's fade start,
+        # so the first faded frames don't come out of a cold decoder.
+        for i in range(PREROLL_FRAMES, 0, -1):
+            pcm = old_decoder.decode(self.packets[(self._pos - i) % len(self.packets)])
+            encoder.encode(pcm, discord.opus.Encoder.SAMPLES_PER_FRAME)
+            new_decoder.decode(packets[-i % len(packets)])
+        self._next = {
+            'packets': packets,
+            'name': name,
+            'pos': 0,
+            'frame': 0,
+            'old_decoder': old_decoder,
+            'new_decoder': new_decoder,
+            'encoder': encoder,
+        }
+
+    def _take(self, packets, pos):
+        return packets[pos], (pos + 1) % len(packets)
+
+    def read(self):
+        with self._lock:
+            if self._next is None:
+                packet, self._pos = self._take(self.packets, self._pos)
+                return packet
+            fade = self._next
+            old_packet, self._pos = self._take(self.packets, self._pos)
+            new_packet, fade['pos'] = self._take(fade['packets'], fade['pos'])
+            fade['frame'] += 1
+            gain = fade['frame'] / self.crossfade_frames
+            pcm = _mix(fade['old_decoder'].decode(old_packet), fade['new_decoder'].decode(new_packet), gain)
+            packet = fade['encoder'].encode(pcm, discord.opus.Encoder.SAMPLES_PER_FRAME)
+            if fade['frame'] >= self.crossfade_frames:
+                self.packets, self._pos, self.name = fade['packets'], fade['pos'], fade['name']
+                self._next = None
+                if self._queued is not None:
+                    self._start_fade(*self._queued)
+                    self._queued = None
+            return packet